@@ -3,60 +3,312 @@ Flask Backend Server for Tidé Hotels PMS
 Provides REST API endpoints and WebSocket real-time updates
 """
 
-from flask import Flask, request, jsonify
+import sys
+
+# eventlet serves every client socket from one OS thread with cooperative I/O, instead of
+# one thread per connection under 'threading'. It does not support Python 3.13+ yet, so
+# fall back to threading there. monkey_patch() must run before anything else is imported,
+# and only the server entrypoint does it: importers (Flask CLI, scripts, tests) keep the stdlib.
+if __name__ == '__main__' and sys.version_info < (3, 13):
+    import eventlet
+    eventlet.monkey_patch()
+
+# Follow whoever patched the process: the block above, or a host such as gunicorn -k eventlet
+_eventlet = sys.modules.get('eventlet')
+ASYNC_MODE = 'eventlet' if _eventlet and _eventlet.patcher.is_monkey_patched('socket') else 'threading'
+
+from flask import Flask, Response, request, jsonify, has_app_context
+from flask.json.provider import JSONProvider
 from flask_cors import CORS
 from flask_socketio import SocketIO, emit
-from sqlalchemy.orm import Session
+from sqlalchemy import select, func, case, null, literal
+from sqlalchemy import Float, DateTime, JSON
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import Session, raiseload
 from datetime import datetime
-import json
+from itertools import chain
+import threading
+import uuid
+import orjson
 
 from database import engine, init_db, db_session
 from models import (
     Room, Guest, Reservation, Transaction, LoyaltyTransaction, WalkInTransaction,
     Order, Employee, MaintenanceRequest, RoomType, Settings, SyncLog,
-    RoomStatusEnum, MaintenanceStatusEnum, LoyaltyTierEnum
+    RoomStatusEnum, MaintenanceStatusEnum, LoyaltyTierEnum, to_camel_case
 )
 
+# to_dict() hands datetimes to orjson unformatted; created_at columns hold naive UTC
+# (datetime.utcnow), so OPT_NAIVE_UTC serializes them with an explicit +00:00 offset
+ORJSON_OPTIONS = orjson.OPT_NAIVE_UTC
+
+class OrjsonProvider(JSONProvider):
+    """orjson-backed JSON for jsonify() and, via app.json, for python-socketio packets"""
+
+    def dumps(self, obj, **kwargs):
+        # Callers pass stdlib options (separators=..., sort_keys=...); orjson output is compact
+        return orjson.dumps(obj, option=ORJSON_OPTIONS).decode('utf-8')
+
+    def loads(self, s, **kwargs):
+        return orjson.loads(s)
+
 # Initialize Flask app
 app = Flask(__name__)
 app.config['SECRET_KEY'] = 'tide-hotels-secret-key-change-in-production'
+# One encoder for every output path, so a datetime in to_dict() is formatted the same
+# by REST responses, socket events and the cached snapshot
+app.json = OrjsonProvider(app)
 CORS(app, resources={r"/*": {"origins": "*"}})
 
 # Initialize SocketIO
-# Using 'threading' mode to be compatible with Python 3.13
-# For production with high concurrency, you can switch to 'eventlet' or 'gevent' on Python <=3.12
-socketio = SocketIO(app, cors_allowed_origins="*", async_mode='threading')
+# Under eventlet the scoped db_session is per green thread (threading.local is patched),
+# and the engine's check_same_thread=False lets pooled SQLite connections move between them.
+# sqlite3 calls are not green, though: a query blocks the whole hub, so while a snapshot
+# rebuild holds _cache_lock no other socket is served. Rebuilds only follow writes and the
+# JSON1 path is a single SELECT, which keeps the stall short; eventlet.tpool would avoid it,
+# but would run db_session work on OS threads outside the per-green-thread scoping.
+socketio = SocketIO(app, cors_allowed_origins="*", async_mode=ASYNC_MODE, json=app.json)
 
 # Initialize database
 init_db()
 
+@app.teardown_appcontext
+def shutdown_session(exception=None):
+    """Release the thread's scoped session (identity map and connection) after each request or socket event"""
+    db_session.remove()
+
+# Serialized snapshot of get_all_data(), rebuilt lazily after a write invalidates it
+_cached_payload = None
+_cache_lock = threading.Lock()
+# Bumped with every invalidation and served as the snapshot's ETag; the per-process prefix
+# keeps a tag issued before a restart (when the counter starts over) from ever matching
+_data_version = 0
+_ETAG_PREFIX = uuid.uuid4().hex[:12]
+
+def invalidate_data_cache():
+    """Drop the cached snapshot so the next read rebuilds it from the database"""
+    global _cached_payload, _data_version
+    with _cache_lock:
+        _cached_payload = None
+        _data_version += 1
+
+def data_etag():
+    """ETag of the current data snapshot"""
+    return f'{_ETAG_PREFIX}-v{_data_version}'
+
+def get_all_data_bytes():
+    """Return the orjson-encoded snapshot of all data, or None if the read failed; rebuilt only when invalidated"""
+    global _cached_payload
+    payload = _cached_payload
+    if payload is not None:
+        return payload
+    with _cache_lock:
+        if _cached_payload is None:
+            # A failed read returns None, which leaves the cache empty for the next caller
+            _cached_payload = _build_data_payload()
+        return _cached_payload
+
 # Helper function to broadcast data updates
 def broadcast_data_update():
     """Send complete data state to all connected clients"""
+    invalidate_data_cache()
+    try:
+        payload = get_all_data_bytes()
+    finally:
+        # Inside a request, shutdown_session releases the session at teardown (removing it
+        # here would detach the route's objects); background callers have no teardown
+        if not has_app_context():
+            db_session.remove()
+    if payload is None:
+        # Clients keep their current state until the next successful broadcast
+        return
+    # Fragment embeds the cached bytes as-is when OrjsonProvider encodes the packet, and
+    # python-socketio >= 5.9 encodes a broadcast once and sends that same frame to every client
+    socketio.emit('data_update', orjson.Fragment(payload))
+
+def broadcast_patch(entity, rows):
+    """Send only the changed rows of one collection (e.g. 'rooms') to all connected clients"""
+    # Clients merge the rows by id, so a room-status flip costs one serialized room rather
+    # than the whole snapshot; deletions and bulk changes still use broadcast_data_update()
+    invalidate_data_cache()
+    socketio.emit('data_patch', {entity: [row.to_dict() for row in rows]})
+
+def _row_select(model):
+    """Core SELECT of model.serialized_columns, labelled with their to_dict() keys"""
+    columns = model.__table__.c
+    return select(*(columns[name].label(to_camel_case(name)) for name in model.serialized_columns))
+
+# Flat tables are read through Core: rows come back as mappings already keyed like
+# to_dict(), skipping ORM instance construction and per-attribute descriptor access.
+_ROW_SELECTS = {
+    model: _row_select(model)
+    for model in (Room, Guest, Reservation, Transaction, LoyaltyTransaction,
+                  WalkInTransaction, Employee, MaintenanceRequest, SyncLog)
+}
+
+def _fetch_rows(stmt):
+    """Execute a Core SELECT and return its rows as plain dicts"""
+    return [dict(row) for row in db_session.execute(stmt).mappings()]
+
+# ============= SQL-SIDE SNAPSHOT =============
+# With SQLite's JSON1 functions the whole snapshot is rendered inside the engine:
+# one SELECT returns one JSON array (or object) per key of get_all_data(), and the
+# blobs are spliced into the payload without building Python dicts at all.
+
+def _json_object(*pairs):
+    return func.json_object(*chain.from_iterable(pairs))
+
+def _json_value(column):
+    """Render a column's value exactly as orjson renders what to_dict() reads from it"""
+    if isinstance(column.type, Float):
+        # json_object writes REALs with 15 significant digits; 17 always round-trip a double
+        return case((column.is_(None), null()), else_=func.json(func.printf('%!.17g', column)))
+    if isinstance(column.type, DateTime):
+        # Stored as 'YYYY-MM-DD HH:MM:SS.ffffff' naive UTC; OPT_NAIVE_UTC appends +00:00 and
+        # drops the fraction when it is zero ('.000000' can only occur as that suffix)
+        return func.replace(func.replace(column, '.000000', ''), ' ', 'T').concat('+00:00')
+    if isinstance(column.type, JSON):
+        return func.json(column)
+    return column
+
+def _json_rows(model, source=None):
+    """json_group_array over model.serialized_columns, shaped like to_dict()"""
+    source = model.__table__ if source is None else source
+    row = _json_object(*((to_camel_case(name), _json_value(source.c[name]))
+                         for name in model.serialized_columns))
+    return select(func.json_group_array(row)).select_from(source)
+
+def _json_setting(key, default):
+    stored = select(func.json(Settings.value)).where(Settings.key == key).scalar_subquery()
+    return func.coalesce(stored, func.json(orjson.dumps(default).decode('utf-8')))
+
+_room_types = RoomType.__table__
+_orders = Order.__table__
+_recent_sync_logs = select(SyncLog.__table__).order_by(SyncLog.id.desc()).limit(50).subquery()
+
+# RoomType and Order don't serialize as flat rows, so their to_dict() shapes are spelled out
+_ROOM_TYPE_JSON = (
+    ('id', _room_types.c.id),
+    ('name', _room_types.c.name),
+    ('rates', _json_object(('NGN', _json_value(_room_types.c.rate_ngn)),
+                           ('USD', _json_value(_room_types.c.rate_usd)))),
+    ('capacity', _room_types.c.capacity),
+)
+_ORDER_JSON = tuple(
+    (to_camel_case(name), _json_value(_orders.c[name]))
+    for name in ('id', 'room_id', 'items', 'total', 'status', 'created_at')
+)
+
+_PAYLOAD_SELECT = select(
+    select(func.json_group_array(_json_object(*_ROOM_TYPE_JSON))).scalar_subquery().label('roomTypes'),
+    _json_rows(Room).scalar_subquery().label('rooms'),
+    _json_rows(Guest).scalar_subquery().label('guests'),
+    _json_rows(Reservation).scalar_subquery().label('reservations'),
+    _json_rows(Transaction).scalar_subquery().label('transactions'),
+    _json_rows(LoyaltyTransaction).scalar_subquery().label('loyaltyTransactions'),
+    _json_rows(WalkInTransaction).scalar_subquery().label('walkInTransactions'),
+    select(func.json_group_array(_json_object(*_ORDER_JSON))).scalar_subquery().label('orders'),
+    _json_rows(Employee).scalar_subquery().label('employees'),
+    _json_rows(MaintenanceRequest).scalar_subquery().label('maintenanceRequests'),
+    _json_rows(SyncLog, _recent_sync_logs).scalar_subquery().label('syncLog'),
+    _json_setting('tax_settings', {'isEnabled': True, 'rate': 7.5}).label('taxSettings'),
+    _json_setting('stop_sell', {}).label('stopSell'),
+)
+
+# Values whose text form differs between SQLite and orjson unless _json_value() handles them
+_PARITY_SAMPLES = (
+    (Float(), (0.1 + 0.2, 1 / 3, 123456789012.34567, 1e-7, 5.0, 0.0, None)),
+    (DateTime(), (datetime(2024, 1, 1, 12), datetime(2024, 1, 1, 12, 0, 0, 120000),
+                  datetime(2024, 1, 1, 12, 0, 0, 5))),
+    (JSON(), ([{'name': 'Tea', 'qty': 2, 'price': 0.1 + 0.2}], {})),
+)
+
+def _sqlite_has_json1():
+    """JSON1 is built into SQLite since 3.38 and optional before that"""
+    try:
+        with engine.connect() as conn:
+            conn.exec_driver_sql("SELECT json('[]')")
+        return True
+    except OperationalError:
+        return False
+
+_USE_SQL_SNAPSHOT = _sqlite_has_json1()
+
+def _check_snapshot_parity():
+    """Fail at startup if any to_dict() and its SQL-side rendering disagree on keys or values"""
+    expected = {model: [to_camel_case(name) for name in model.serialized_columns]
+                for model in _ROW_SELECTS}
+    expected[RoomType] = [key for key, _ in _ROOM_TYPE_JSON]
+    expected[Order] = [key for key, _ in _ORDER_JSON]
+    for model, keys in expected.items():
+        # A transient instance is enough: to_dict() only reads column attributes
+        emitted = list(model().to_dict())
+        if emitted != keys:
+            raise RuntimeError(
+                f'{model.__name__}.to_dict() emits {emitted}, SQL snapshot renders {keys}')
+    rates = list(RoomType().to_dict()['rates'])
+    if rates != ['NGN', 'USD']:
+        raise RuntimeError(f'RoomType.to_dict() rates emit {rates}, SQL snapshot renders NGN, USD')
+    if not _USE_SQL_SNAPSHOT:
+        return
+    samples = [(type_, value) for type_, values in _PARITY_SAMPLES for value in values]
+    rendered = select(func.json_array(*(_json_value(literal(value, type_))
+                                        for type_, value in samples)))
+    with engine.connect() as conn:
+        from_sql = orjson.loads(conn.execute(rendered).scalar())
+    for (type_, value), sql_value in zip(samples, from_sql):
+        py_value = orjson.loads(orjson.dumps(value, option=ORJSON_OPTIONS))
+        if sql_value != py_value:
+            raise RuntimeError(
+                f'SQL snapshot renders {type(type_).__name__} {value!r} as {sql_value!r}, '
+                f'orjson as {py_value!r}')
+
+_check_snapshot_parity()
+
+def _query_data_payload():
+    """Render the full snapshot as JSON bytes inside SQLite"""
+    row = db_session.execute(_PAYLOAD_SELECT).one()
+    return b'{' + b','.join(
+        b'"%s":%s' % (key.encode('utf-8'), value.encode('utf-8'))
+        for key, value in row._mapping.items()
+    ) + b'}'
+
+def _build_data_payload():
+    """Serialize all data, or return None if the database read failed"""
+    if _USE_SQL_SNAPSHOT:
+        try:
+            return _query_data_payload()
+        except Exception as e:
+            print(f"Error building data payload: {e}")
+            return None
     data = get_all_data()
-    socketio.emit('data_update', data, broadcast=True)
+    return orjson.dumps(data, option=ORJSON_OPTIONS) if data else None
 
 def get_all_data():
     """Retrieve all data from database"""
     try:
         tax_setting = db_session.query(Settings).filter_by(key='tax_settings').first()
-        tax_settings = json.loads(tax_setting.value) if tax_setting else {'isEnabled': True, 'rate': 7.5}
+        tax_settings = tax_setting.value if tax_setting else {'isEnabled': True, 'rate': 7.5}
 
         stop_sell_setting = db_session.query(Settings).filter_by(key='stop_sell').first()
-        stop_sell = json.loads(stop_sell_setting.value) if stop_sell_setting else {}
+        stop_sell = stop_sell_setting.value if stop_sell_setting else {}
+
+        # to_dict() must only read columns: any relationship access on this hot path
+        # raises instead of silently issuing a per-row SELECT
+        no_lazy_sql = raiseload('*', sql_only=True)
 
         return {
-            'roomTypes': [rt.to_dict() for rt in db_session.query(RoomType).all()],
-            'rooms': [r.to_dict() for r in db_session.query(Room).all()],
-            'guests': [g.to_dict() for g in db_session.query(Guest).all()],
-            'reservations': [r.to_dict() for r in db_session.query(Reservation).all()],
-            'transactions': [t.to_dict() for t in db_session.query(Transaction).all()],
-            'loyaltyTransactions': [lt.to_dict() for lt in db_session.query(LoyaltyTransaction).all()],
-            'walkInTransactions': [wt.to_dict() for wt in db_session.query(WalkInTransaction).all()],
-            'orders': [o.to_dict() for o in db_session.query(Order).all()],
-            'employees': [e.to_dict() for e in db_session.query(Employee).all()],
-            'maintenanceRequests': [mr.to_dict() for mr in db_session.query(MaintenanceRequest).all()],
-            'syncLog': [sl.to_dict() for sl in db_session.query(SyncLog).order_by(SyncLog.id.desc()).limit(50).all()],
+            'roomTypes': [rt.to_dict() for rt in db_session.query(RoomType).options(no_lazy_sql).all()],
+            'rooms': _fetch_rows(_ROW_SELECTS[Room]),
+            'guests': _fetch_rows(_ROW_SELECTS[Guest]),
+            'reservations': _fetch_rows(_ROW_SELECTS[Reservation]),
+            'transactions': _fetch_rows(_ROW_SELECTS[Transaction]),
+            'loyaltyTransactions': _fetch_rows(_ROW_SELECTS[LoyaltyTransaction]),
+            'walkInTransactions': _fetch_rows(_ROW_SELECTS[WalkInTransaction]),
+            'orders': [o.to_dict() for o in db_session.query(Order).options(no_lazy_sql).all()],
+            'employees': _fetch_rows(_ROW_SELECTS[Employee]),
+            'maintenanceRequests': _fetch_rows(_ROW_SELECTS[MaintenanceRequest]),
+            'syncLog': _fetch_rows(_ROW_SELECTS[SyncLog].order_by(SyncLog.id.desc()).limit(50)),
             'taxSettings': tax_settings,
             'stopSell': stop_sell
         }
@@ -65,6 +317,27 @@ def get_all_data():
         return {}
 
 # ============= REST API ENDPOINTS =============
+
+@app.route('/api/data', methods=['GET'])
+def get_data():
+    """Full data snapshot; answers 304 Not Modified while the client's copy is current"""
+    # Read the tag before the payload: a write in between only makes the body newer than
+    # its tag, which costs the client one extra full fetch, never a stale 304
+    etag = data_etag()
+    # If-None-Match compares weakly (RFC 9110 13.1.2): proxies that compress the body,
+    # nginx's gzip among them, hand the tag back as W/"..."
+    if request.if_none_match.contains_weak(etag):
+        response = Response(status=304)
+    else:
+        payload = get_all_data_bytes()
+        if payload is None:
+            return jsonify({'error': 'Failed to load data'}), 500
+        response = Response(payload, mimetype='application/json')
+    response.set_etag(etag)
+    # Let browsers keep the body but revalidate it on every request
+    response.headers['Cache-Control'] = 'no-cache'
+    return response
+
 # ... Keep all your existing REST API routes unchanged ...
 
 # ============= WEBSOCKET EVENTS =============
@@ -73,7 +346,12 @@ def get_all_data():
 def handle_connect():
     """Handle client connection"""
     print('Client connected')
-    emit('data_update', get_all_data())
+    payload = get_all_data_bytes()
+    if payload is None:
+        # Keep the connection; the client gets data with the next broadcast
+        print('Initial data unavailable for new client')
+        return
+    emit('data_update', orjson.Fragment(payload))
 
 @socketio.on('disconnect')
 def handle_disconnect():
@@ -85,5 +363,5 @@ def handle_disconnect():
 if __name__ == '__main__':
     print("Starting Tidé Hotels PMS Backend Server...")
     print("Server running on http://localhost:5001")
-    # Using 'threading' mode, compatible with Python 3.13
+    print(f"SocketIO async mode: {ASYNC_MODE}")
     socketio.run(app, host='0.0.0.0', port=5001, debug=True)
@@ -4,10 +4,12 @@ Database Configuration for Tide Hotels PMS
 Provides SQLAlchemy setup with SQLite database
 """
 
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event, case
+from sqlalchemy.pool import QueuePool
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker, scoped_session
 import os
+import orjson
 
 # Database file path
 BASE_DIR = os.path.abspath(os.path.dirname(__file__))
@@ -15,12 +17,32 @@ DATABASE_PATH = os.path.join(BASE_DIR, 'tide_hotels.db')
 DATABASE_URL = f'sqlite:///{DATABASE_PATH}'
 
 # Create engine
+# QueuePool keeps connections open between requests (SQLAlchemy 1.4 defaults to NullPool
+# for SQLite files), so the pragmas below, the page cache and the mmap persist per connection
 engine = create_engine(
     DATABASE_URL,
     connect_args={"check_same_thread": False},
+    poolclass=QueuePool,
+    # JSON columns (Order.items, Settings.value) are encoded and parsed with orjson
+    json_serializer=lambda obj: orjson.dumps(obj).decode('utf-8'),
+    json_deserializer=orjson.loads,
     echo=False
 )
 
+
+@event.listens_for(engine, 'connect')
+def set_sqlite_pragmas(dbapi_connection, connection_record):
+    """Tune every new SQLite connection for a read-heavy, frequently committing workload"""
+    cursor = dbapi_connection.cursor()
+    # WAL lets broadcasts read while a request commits; NORMAL drops the fsync per commit
+    cursor.execute('PRAGMA journal_mode=WAL')
+    cursor.execute('PRAGMA synchronous=NORMAL')
+    # Read pages through a 256 MB memory map and keep a 64 MB page cache
+    cursor.execute('PRAGMA mmap_size=268435456')
+    cursor.execute('PRAGMA cache_size=-65536')
+    cursor.execute('PRAGMA temp_store=MEMORY')
+    cursor.close()
+
 # Create a configured session class
 SessionLocal = sessionmaker(
     autocommit=False,
@@ -40,6 +62,19 @@ def init_db():
     """Initialize the database, creating all tables"""
     import models
     Base.metadata.create_all(bind=engine)
+    # create_all() skips tables that already exist, so add indexes introduced since
+    for table in Base.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(bind=engine, checkfirst=True)
+    # Rows written by the former Enum columns store member names ('OUT_OF_ORDER'); store values
+    with engine.begin() as conn:
+        for column, enum_class in models.ENUM_COLUMNS:
+            names = {member.name: member.value for member in enum_class}
+            conn.execute(
+                column.table.update()
+                .where(column.in_(list(names)))
+                .values({column: case(names, value=column)})
+            )
     print(f"Database initialized at: {DATABASE_PATH}")
 
 
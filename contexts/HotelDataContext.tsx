@@ -38,6 +38,46 @@ const INITIAL_STATE: HotelState = {
     stopSell: {},
 };
 
+// Partial state sent by the server's 'data_patch' event: only the rows that changed.
+type HotelStatePatch = Partial<HotelState>;
+
+const SYNC_LOG_LIMIT = 50;
+
+// Rows replace their counterparts by id; ids not seen before are appended.
+function mergeById<T extends { id: number }>(current: T[], incoming: T[]): T[] {
+    const updates = new Map(incoming.map(row => [row.id, row]));
+    const merged = current.map(row => {
+        const updated = updates.get(row.id);
+        if (updated === undefined) return row;
+        updates.delete(row.id);
+        return updated;
+    });
+    return [...merged, ...updates.values()];
+}
+
+// Merge one patched value: sync log entries are prepended, other lists merge by id,
+// and non-list values (taxSettings, stopSell) are replaced outright.
+function patchKey<K extends keyof HotelState>(next: HotelState, key: K, incoming: HotelState[K]): void {
+    const current: HotelState[K] = next[key];
+    if (Array.isArray(current) && Array.isArray(incoming)) {
+        const merged = key === 'syncLog'
+            ? [...incoming, ...current].slice(0, SYNC_LOG_LIMIT)
+            : mergeById(current, incoming);
+        next[key] = merged as HotelState[K];
+    } else {
+        next[key] = incoming;
+    }
+}
+
+function applyPatch(state: HotelState, patch: HotelStatePatch): HotelState {
+    const next = { ...state };
+    for (const key of Object.keys(patch) as (keyof HotelState)[]) {
+        const incoming = patch[key];
+        if (incoming !== undefined) patchKey(next, key, incoming);
+    }
+    return next;
+}
+
 export const HotelDataContext = createContext<HotelData | undefined>(undefined);
 
 async function apiRequest(endpoint: string, method: string = 'GET', body?: any) {
@@ -99,6 +139,12 @@ export const HotelDataProvider: React.FC<{ children: ReactNode }> = ({ children
             setState(updatedData);
         });
 
+        // Small mutations arrive as 'data_patch' with only the changed rows,
+        // which are merged by id into the state we already hold.
+        socket.on('data_patch', (patch: HotelStatePatch) => {
+            setState(prev => applyPatch(prev, patch));
+        });
+
         socket.on('disconnect', () => {
             console.log('Disconnected from backend WebSocket.');
             setIsConnected(false);